@@ -28,7 +28,7 @@ class RoomServiceOrder(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     guest_id = db.Column(db.Integer, db.ForeignKey('guest.id'), nullable=False)
     room_number = db.Column(db.String(10), nullable=False)
-    order_items = db.Column(db.Text, nullable=False)  # Stored as JSON
+    order_items = db.Column(db.JSON, nullable=False)  # List of {name, price, quantity}
     special_instructions = db.Column(db.Text, nullable=True)
     order_date = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default='pending')  # pending, in-progress, delivered, cancelled
@@ -50,6 +50,12 @@ class TransportationRequest(db.Model):
     status = db.Column(db.String(20), default='pending')  # pending, confirmed, completed, cancelled
     request_date = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Serves the upcoming transportation query: equality on guest_id, IN on status,
+    # then range/order on pickup_time
+    __table_args__ = (
+        db.Index('ix_tr_guest_status_pickup', 'guest_id', 'status', 'pickup_time'),
+    )
+
     def __repr__(self):
         return f'<TransportationRequest {self.id} to {self.destination}>'
 
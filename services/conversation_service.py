@@ -194,11 +194,13 @@ def process_message(message, guest, conversation_history, context):
         # Special handling for certain detected intents
         if intent == "room_service" and 'order_items' in entities and entities['order_items']:
             # Log food preference for future personalization
-            if 'food_preferences' not in updated_context:
-                updated_context['food_preferences'] = []
+            food_preferences = updated_context.setdefault('food_preferences', [])
+            # The context is serialized to JSON, so the list is kept and the set only dedupes
+            known_items = set(food_preferences)
             for item in entities['order_items']:
-                if item not in updated_context['food_preferences']:
-                    updated_context['food_preferences'].append(item)
+                if item not in known_items:
+                    known_items.add(item)
+                    food_preferences.append(item)
         
         elif intent == "recommendation" and 'category' in entities:
             # Track recommendation categories requested
@@ -317,20 +319,20 @@ def handle_recommendation_request(guest, entities, context):
             return f"Lo siento, no tengo recomendaciones de {category} en este momento. ¿Puedo ayudarte con otra cosa?"
         
         # Format response
-        response = f"Aquí tienes algunas recomendaciones de {category} para ti:\n\n"
+        parts = [f"Aquí tienes algunas recomendaciones de {category} para ti:\n\n"]
         
         for i, rec in enumerate(recommendations[:3], 1):
-            response += f"{i}. {rec['name']} - {rec['description']}\n"
-            response += f"   📍 {rec['address']}\n"
+            parts.append(f"{i}. {rec['name']} - {rec['description']}\n")
+            parts.append(f"   📍 {rec['address']}\n")
             if 'distance' in rec:
-                response += f"   🚶 A {rec['distance']} del hotel\n"
+                parts.append(f"   🚶 A {rec['distance']} del hotel\n")
             if 'hours' in rec and rec['hours']:
-                response += f"   🕒 {rec['hours']}\n"
-            response += "\n"
+                parts.append(f"   🕒 {rec['hours']}\n")
+            parts.append("\n")
             
-        response += "¿Te gustaría más información sobre alguno de estos lugares?"
+        parts.append("¿Te gustaría más información sobre alguno de estos lugares?")
         
-        return response
+        return ''.join(parts)
         
     except Exception as e:
         logger.error(f"Error handling recommendation: {str(e)}")
@@ -361,19 +363,18 @@ def handle_room_service(guest, entities, context):
     try:
         menu = get_menu()
         
-        response = "Aquí tienes nuestro menú de servicio a la habitación:\n\n"
+        parts = ["Aquí tienes nuestro menú de servicio a la habitación:\n\n"]
         
         # Group by category
         for category, items in menu.items():
-            response += f"**{category}**\n"
-            for item in items:
-                response += f"• {item['name']} - ${item['price']}\n"
-            response += "\n"
+            parts.append(f"**{category}**\n")
+            parts.extend(f"• {item['name']} - ${item['price']}\n" for item in items)
+            parts.append("\n")
             
-        response += ("Para ordenar, puedes decirme algo como 'Quiero ordenar una hamburguesa y una limonada' "
+        parts.append("Para ordenar, puedes decirme algo como 'Quiero ordenar una hamburguesa y una limonada' "
                      "o 'Por favor tráeme un sandwich de pollo a la habitación'.")
         
-        return response
+        return ''.join(parts)
         
     except Exception as e:
         logger.error(f"Error getting room service menu: {str(e)}")
@@ -540,29 +541,29 @@ Simplemente háblame como lo harías normalmente. Por ejemplo:
 ¿En qué puedo ayudarte ahora?"""
 
 
+_THANKS_RESPONSES = (
+    "De nada, es un placer ayudarte.",
+    "Para eso estoy aquí. ¿Hay algo más en lo que pueda asistirte?",
+    "No hay de qué. Estoy aquí para hacer tu estadía más cómoda.",
+    "Es mi placer. Si necesitas cualquier otra cosa, solo pregunta."
+)
+
+
 def handle_thanks():
     """Handle thanks intent"""
-    responses = [
-        "De nada, es un placer ayudarte.",
-        "Para eso estoy aquí. ¿Hay algo más en lo que pueda asistirte?",
-        "No hay de qué. Estoy aquí para hacer tu estadía más cómoda.",
-        "Es mi placer. Si necesitas cualquier otra cosa, solo pregunta."
-    ]
-    return responses[datetime.now().second % len(responses)]
+    return _THANKS_RESPONSES[datetime.now().second % len(_THANKS_RESPONSES)]
+
+
+# Known restaurant/place names, paired with their lowercase form for matching
+_KNOWN_PLACES = tuple((place, place.lower()) for place in (
+    "Mondongos", "Carmen", "El Cielo", "OCI.Mde",
+    # Add other known restaurant/place names
+))
 
 
 def extract_place_references(text):
     """Extract potential place names from text using NLP"""
     # This is a simplified version - in practice, you'd want to use a proper NLP library
     # and maintain a list of known places
-    known_places = [
-        "Mondongos", "Carmen", "El Cielo", "OCI.Mde",
-        # Add other known restaurant/place names
-    ]
-    
-    found_places = []
-    for place in known_places:
-        if place.lower() in text.lower():
-            found_places.append(place)
-    
-    return found_places
+    text_lower = text.lower()
+    return [place for place, place_lower in _KNOWN_PLACES if place_lower in text_lower]
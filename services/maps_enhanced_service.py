@@ -51,29 +51,33 @@ def get_nearby_places(place_type, radius=1500, language="es"):
             
         # Process and format results
         places = []
+        hotel_lat = HOTEL_COORDINATES['latitude']
+        hotel_lng = HOTEL_COORDINATES['longitude']
         for place in data['results'][:10]:  # Limit to top 10 results
+            location = place['geometry']['location']
             place_details = {
                 'name': place['name'],
                 'address': place.get('vicinity', 'Dirección no disponible'),
                 'rating': place.get('rating', 'No disponible'),
                 'user_ratings_total': place.get('user_ratings_total', 0),
                 'place_id': place['place_id'],
-                'location': place['geometry']['location'],
+                'location': location,
                 'types': place.get('types', []),
                 'price_level': place.get('price_level', 0)
             }
             
             # Add photos if available
-            if 'photos' in place:
-                photo_reference = place['photos'][0]['photo_reference']
+            photos = place.get('photos')
+            if photos:
+                photo_reference = photos[0]['photo_reference']
                 place_details['photo_url'] = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=400&photoreference={photo_reference}&key={GOOGLE_MAPS_API_KEY}"
             
             # Calculate distance from hotel
             place_details['distance'] = calculate_distance(
-                HOTEL_COORDINATES['latitude'],
-                HOTEL_COORDINATES['longitude'],
-                place['geometry']['location']['lat'],
-                place['geometry']['location']['lng']
+                hotel_lat,
+                hotel_lng,
+                location['lat'],
+                location['lng']
             )
             
             places.append(place_details)
@@ -206,8 +206,10 @@ def get_service_specific_context(prompt, context):
     """
     Get relevant context for specific services mentioned in the prompt
     """
+    prompt_lower = prompt.lower()
+    
     # Check for room service related queries
-    if any(term in prompt.lower() for term in ["comida", "comer", "hambre", "room service", "menú", "desayuno", "almuerzo", "cena"]):
+    if any(term in prompt_lower for term in ["comida", "comer", "hambre", "room service", "menú", "desayuno", "almuerzo", "cena"]):
         return (
             "El servicio a la habitación está disponible 24/7. El menú incluye opciones internacionales y locales. "
             "Los platos más populares son el Filete de Pescado Caribeño, Bandeja Paisa y Risotto de Setas. "
@@ -216,7 +218,7 @@ def get_service_specific_context(prompt, context):
         )
     
     # Check for transportation related queries
-    elif any(term in prompt.lower() for term in ["taxi", "uber", "transporte", "ir a", "visitar", "llegar"]):
+    elif any(term in prompt_lower for term in ["taxi", "uber", "transporte", "ir a", "visitar", "llegar"]):
         return (
             "El hotel ofrece servicio de transporte privado con reserva previa (mínimo 2 horas). "
             "También podemos llamar un taxi de confianza. Uber y DiDi funcionan bien en la ciudad. "
@@ -225,8 +227,8 @@ def get_service_specific_context(prompt, context):
         )
     
     # Check for local recommendations
-    elif any(term in prompt.lower() for term in ["recomendar", "visitar", "conocer", "turismo", "actividad"]):
-        if "restaurante" in prompt.lower() or "comer" in prompt.lower():
+    elif any(term in prompt_lower for term in ["recomendar", "visitar", "conocer", "turismo", "actividad"]):
+        if "restaurante" in prompt_lower or "comer" in prompt_lower:
             return (
                 "Restaurantes recomendados cerca del hotel: "
                 "El Cielo (alta cocina colombiana, 5 min en taxi), "
@@ -1,8 +1,14 @@
 import logging
+import heapq
 import json
 import os
 import random
+from collections import defaultdict
 from datetime import datetime
+from functools import lru_cache
+from math import sin, cos, sqrt, atan2, radians
+from operator import itemgetter
+from sqlalchemy.orm import raiseload
 from config import RECOMMENDATION_CATEGORIES, HOTEL_COORDINATES
 from models import Recommendation
 from app import db
@@ -10,14 +16,52 @@ from services.weather_service import get_current_weather
 
 logger = logging.getLogger(__name__)
 
+# Mapeo de nombres de categoría en español a su clave interna
+_CATEGORY_ALIASES = {v.lower(): k for k, v in RECOMMENDATION_CATEGORIES.items()}
+
+# Consejos según el clima: (etiqueta ideal, consejo si la tiene, consejo si no)
+_WEATHER_TIPS = {
+    'lluv': (
+        'indoor',
+        "Perfecto para un día lluvioso como hoy.",
+        "No olvide llevar paraguas ya que hoy está lloviendo."
+    ),
+    'solea': (
+        'outdoor',
+        "Ideal para disfrutar del buen clima de hoy.",
+        "Una buena opción para escapar del calor de hoy."
+    )
+}
+
+# Consejos según la hora del día
+_TIME_TIPS = {
+    'morning': "Excelente para comenzar el día con energía.",
+    'afternoon': "Perfecto para su tarde en Medellín."
+}
+_DEFAULT_TIME_TIP = "Una gran opción para disfrutar de la noche en la ciudad."
+
+# Caché de recomendaciones convertidas a diccionario e indexadas por categoría;
+# la versión aumenta con cada invalidación
+_REC_CACHE = {
+    "version": 0,
+    "recommendations": None,
+    "by_category": None
+}
+
+def invalidate_recommendations_cache():
+    """Drop the cached recommendations; call after adding, editing or deleting Recommendation rows"""
+    _REC_CACHE["version"] += 1
+    _REC_CACHE["recommendations"] = None
+    _REC_CACHE["by_category"] = None
+
 def load_recommendations():
     """Load recommendations from database or file"""
     try:
         # Intentar cargar desde la base de datos
-        db_recommendations = Recommendation.query.all()
+        db_recommendations = Recommendation.query.options(raiseload('*')).all()
         
         if db_recommendations:
-            logger.debug(f"Loaded {len(db_recommendations)} recommendations from database")
+            logger.debug("Loaded %d recommendations from database", len(db_recommendations))
             return db_recommendations
         
         # Si no hay recomendaciones en la base de datos, cargar desde archivo
@@ -46,8 +90,8 @@ def load_recommendations():
                     db.session.add(db_rec)
                 
                 db.session.commit()
-                logger.info(f"Imported {len(recommendations_data)} recommendations into database")
-                return Recommendation.query.all()
+                logger.info("Imported %d recommendations into database", len(recommendations_data))
+                return Recommendation.query.options(raiseload('*')).all()
         
         # Si el archivo no existe, generar datos de ejemplo
         default_recommendations = _generate_default_recommendations()
@@ -75,14 +119,73 @@ def load_recommendations():
             db.session.add(db_rec)
         
         db.session.commit()
-        logger.info(f"Generated and saved {len(default_recommendations)} default recommendations")
-        return Recommendation.query.all()
+        logger.info("Generated and saved %d default recommendations", len(default_recommendations))
+        return Recommendation.query.options(raiseload('*')).all()
         
     except Exception as e:
-        logger.error(f"Error loading recommendations: {str(e)}")
+        logger.error("Error loading recommendations: %s", e)
         # Si ocurre algún error, devolver recomendaciones por defecto sin guardarlas
         return _generate_default_recommendations()
 
+def _rec_to_dict(rec):
+    """Convert a Recommendation model into a recommendation dictionary"""
+    if not isinstance(rec, Recommendation):
+        return rec
+    
+    return {
+        'id': rec.id,
+        'name': rec.name,
+        'category': rec.category,
+        'description': rec.description,
+        'address': rec.address,
+        'latitude': rec.latitude,
+        'longitude': rec.longitude,
+        'phone': rec.phone,
+        'website': rec.website,
+        'price_level': rec.price_level,
+        'hours': rec.hours,  # JSON sin decodificar, ver _load_hours
+        'best_for': rec.best_for,
+        'tags': tuple(rec.tags.split(',')) if rec.tags else ()
+    }
+
+def _load_hours(rec):
+    """Decode a recommendation's JSON hours on first access and keep the result"""
+    hours = rec.get('hours')
+    if isinstance(hours, str):
+        hours = json.loads(hours) if hours else {}
+        rec['hours'] = hours
+    elif hours is None:
+        hours = rec['hours'] = {}
+    return hours
+
+def _get_recommendation_index():
+    """
+    Get all recommendations as dictionaries along with an index by category
+    
+    Returns:
+        tuple: (list of recommendation dicts, dict of lowercase category -> list of dicts)
+    """
+    if _REC_CACHE["recommendations"] is not None:
+        return _REC_CACHE["recommendations"], _REC_CACHE["by_category"]
+    
+    version = _REC_CACHE["version"]
+    records = load_recommendations()
+    recommendations = [_rec_to_dict(rec) for rec in records]
+    
+    by_category = defaultdict(list)
+    for rec in recommendations:
+        by_category[rec['category'].lower()].append(rec)
+    by_category = dict(by_category)
+    
+    # Solo guardar en caché lo que viene de la base de datos; las recomendaciones
+    # por defecto se devuelven cuando la carga falla y no deben quedar fijas.
+    # Si se invalidó la caché durante la carga, estos datos ya pueden estar obsoletos
+    if records and isinstance(records[0], Recommendation) and version == _REC_CACHE["version"]:
+        _REC_CACHE["recommendations"] = recommendations
+        _REC_CACHE["by_category"] = by_category
+    
+    return recommendations, by_category
+
 def get_personalized_recommendations(guest_id, category=None, weather_condition=None, time_of_day=None, limit=5):
     """
     Get personalized recommendations based on guest preferences, time, and weather
@@ -98,10 +201,6 @@ def get_personalized_recommendations(guest_id, category=None, weather_condition=
         list: List of recommendation dictionaries
     """
     try:
-        # Cargar todas las recomendaciones
-        all_recommendations = load_recommendations()
-        recommendations = []
-        
         # Determinar la hora del día si no se proporciona
         if not time_of_day:
             hour = datetime.now().hour
@@ -119,87 +218,58 @@ def get_personalized_recommendations(guest_id, category=None, weather_condition=
         else:
             weather_condition = weather_condition.lower()
         
-        # Filtrar por categoría si se proporciona
-        filtered_recommendations = []
+        # Filtrar por categoría si se proporciona, usando el índice por categoría
+        all_recommendations, by_category = _get_recommendation_index()
         if category:
             # Mapear categoría en español a inglés si es necesario
-            category_map = {v.lower(): k for k, v in RECOMMENDATION_CATEGORIES.items()}
-            category_key = category_map.get(category.lower(), category.lower())
+            category_key = _CATEGORY_ALIASES.get(category.lower(), category.lower())
             
-            for rec in all_recommendations:
-                # Si es un objeto de base de datos, convertir a diccionario
-                if isinstance(rec, Recommendation):
-                    rec_dict = {
-                        'id': rec.id,
-                        'name': rec.name,
-                        'category': rec.category,
-                        'description': rec.description,
-                        'address': rec.address,
-                        'latitude': rec.latitude,
-                        'longitude': rec.longitude,
-                        'phone': rec.phone,
-                        'website': rec.website,
-                        'price_level': rec.price_level,
-                        'hours': json.loads(rec.hours) if rec.hours else {},
-                        'best_for': rec.best_for,
-                        'tags': rec.tags.split(',') if rec.tags else []
-                    }
-                else:
-                    rec_dict = rec
-                
-                if category_key in rec_dict['category'].lower():
-                    filtered_recommendations.append(rec_dict)
+            candidates = []
+            for key, recs in by_category.items():
+                if category_key in key:
+                    candidates.extend(recs)
         else:
             # Si no hay categoría, usar todas
-            for rec in all_recommendations:
-                # Si es un objeto de base de datos, convertir a diccionario
-                if isinstance(rec, Recommendation):
-                    rec_dict = {
-                        'id': rec.id,
-                        'name': rec.name,
-                        'category': rec.category,
-                        'description': rec.description,
-                        'address': rec.address,
-                        'latitude': rec.latitude,
-                        'longitude': rec.longitude,
-                        'phone': rec.phone,
-                        'website': rec.website,
-                        'price_level': rec.price_level,
-                        'hours': json.loads(rec.hours) if rec.hours else {},
-                        'best_for': rec.best_for,
-                        'tags': rec.tags.split(',') if rec.tags else []
-                    }
-                else:
-                    rec_dict = rec
-                
-                filtered_recommendations.append(rec_dict)
+            candidates = all_recommendations
         
-        # Ordenar por relevancia (basado en clima, hora del día, etc.)
-        for rec in filtered_recommendations:
+        # Condiciones invariantes para todas las recomendaciones
+        is_rainy = 'lluv' in weather_condition
+        is_sunny = 'solea' in weather_condition
+        jitter = random.random
+        
+        # Calcular relevancia (basado en clima, hora del día, etc.)
+        scored = []
+        for rec in candidates:
             relevance_score = 0
+            best_for = (rec.get('best_for') or '').lower()
             
             # Aumentar relevancia si es bueno para la hora del día actual
-            if time_of_day in rec.get('best_for', '').lower():
+            if time_of_day in best_for:
                 relevance_score += 3
             
             # Aumentar relevancia si es bueno para el clima actual
-            if 'rainy' in rec.get('best_for', '').lower() and 'lluv' in weather_condition:
+            if is_rainy and 'rainy' in best_for:
                 relevance_score += 2
-            if 'sunny' in rec.get('best_for', '').lower() and 'solea' in weather_condition:
+            if is_sunny and 'sunny' in best_for:
                 relevance_score += 2
             
             # Añadir algo de aleatoriedad para variedad
-            relevance_score += random.random()
+            relevance_score += jitter()
             
-            rec['relevance'] = relevance_score
-        
-        # Ordenar por relevancia
-        filtered_recommendations.sort(key=lambda x: x.get('relevance', 0), reverse=True)
+            scored.append((relevance_score, rec))
         
-        # Limitar el número de resultados
-        recommendations = filtered_recommendations[:limit]
+        # Seleccionar las más relevantes sin ordenar la lista completa y copiar
+        # solo esas, para no modificar las entradas compartidas del caché
+        recommendations = []
+        for relevance_score, rec in heapq.nlargest(limit, scored, key=itemgetter(0)):
+            _load_hours(rec)
+            recommendations.append(dict(rec, relevance=relevance_score))
         
         # Calcular distancia aproximada desde el hotel
+        R = 6371  # Radio de la Tierra en km
+        lat1 = radians(HOTEL_COORDINATES['latitude'])
+        lon1 = radians(HOTEL_COORDINATES['longitude'])
+        
         for rec in recommendations:
             # Si no hay coordenadas, asignar una distancia por defecto
             if not rec.get('latitude') or not rec.get('longitude'):
@@ -207,12 +277,6 @@ def get_personalized_recommendations(guest_id, category=None, weather_condition=
                 continue
                 
             # Calcular distancia utilizando la fórmula de Haversine
-            from math import sin, cos, sqrt, atan2, radians
-            
-            R = 6371  # Radio de la Tierra en km
-            
-            lat1 = radians(HOTEL_COORDINATES['latitude'])
-            lon1 = radians(HOTEL_COORDINATES['longitude'])
             lat2 = radians(rec['latitude'])
             lon2 = radians(rec['longitude'])
             
@@ -230,38 +294,31 @@ def get_personalized_recommendations(guest_id, category=None, weather_condition=
                 rec['distance'] = f"{distance:.1f} km"
         
         # Agregar un consejo personalizado basado en el clima y la hora
-        for rec in recommendations:
-            weather_context = ""
-            if 'lluv' in weather_condition:
-                if 'indoor' in rec.get('tags', []):
-                    weather_context = "Perfecto para un día lluvioso como hoy."
-                else:
-                    weather_context = "No olvide llevar paraguas ya que hoy está lloviendo."
-            elif 'solea' in weather_condition:
-                if 'outdoor' in rec.get('tags', []):
-                    weather_context = "Ideal para disfrutar del buen clima de hoy."
-                else:
-                    weather_context = "Una buena opción para escapar del calor de hoy."
-            
-            time_context = ""
-            if time_of_day == "morning":
-                time_context = "Excelente para comenzar el día con energía."
-            elif time_of_day == "afternoon":
-                time_context = "Perfecto para su tarde en Medellín."
-            else:
-                time_context = "Una gran opción para disfrutar de la noche en la ciudad."
+        weather_bucket = 'lluv' if is_rainy else 'solea' if is_sunny else None
+        weather_tips = _WEATHER_TIPS.get(weather_bucket)
+        if weather_tips:
+            # Solo hay dos consejos posibles por llamada: con o sin la etiqueta ideal
+            tag, matching_tip, other_tip = weather_tips
+            time_tip = _TIME_TIPS.get(time_of_day, _DEFAULT_TIME_TIP)
+            matching_tip = f"{matching_tip} {time_tip}"
+            other_tip = f"{other_tip} {time_tip}"
             
-            if weather_context and time_context:
-                rec['tip'] = f"{weather_context} {time_context}"
+            for rec in recommendations:
+                rec['tip'] = matching_tip if tag in rec.get('tags', ()) else other_tip
         
         return recommendations
         
     except Exception as e:
-        logger.error(f"Error getting personalized recommendations: {str(e)}")
+        logger.error("Error getting personalized recommendations: %s", e)
         return []
 
+@lru_cache(maxsize=1)
 def _generate_default_recommendations():
-    """Generate default recommendations for demonstration"""
+    """
+    Generate default recommendations for demonstration
+    
+    The data is static, so it is built once and shared; callers must not modify it.
+    """
     
     # Estamos generando datos aleatorios con sentido para demostración
     # En un entorno de producción, estos datos vendrían de una base de datos real
@@ -542,4 +599,4 @@ def _generate_default_recommendations():
         }
     ]
     
-    return default_recommendations
\ No newline at end of file
+    return tuple(default_recommendations)
\ No newline at end of file
@@ -1,7 +1,10 @@
 import json
 import os
 import logging
+import threading
+import time
 from datetime import datetime
+from difflib import get_close_matches
 from app import db
 from models import Guest, RoomServiceOrder
 
@@ -10,6 +13,71 @@ logger = logging.getLogger(__name__)
 # Cache for menu data
 _menu_cache = None
 
+# Serializes menu loads so concurrent cache misses read the file only once
+_menu_lock = threading.Lock()
+_MENU_FILE = os.path.join('data', 'menu.json')
+
+# Allowed room service order statuses, in workflow order
+_ORDER_STATUSES = ('pending', 'in-progress', 'delivered', 'cancelled')
+_VALID_ORDER_STATUSES = frozenset(_ORDER_STATUSES)
+
+# Short-lived cache of guest_id -> (room_number, timestamp) for repeated orders
+GUEST_ROOM_CACHE_TTL = 60
+GUEST_ROOM_CACHE_SIZE = 512
+_guest_room_cache = {}
+
+# Snapshot derived from the cached menu, published as one tuple so readers never mix
+# two versions: (items keyed by lowercase name, lowercase names in menu order,
+# trigram -> positions of names containing it, positions of names too short to index)
+_menu_index = None
+
+
+def _trigrams(text):
+    """Get the set of character trigrams in a string"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _cache_menu(menu):
+    """Store the menu and its lookup/partial-match snapshot in the module caches"""
+    global _menu_cache, _menu_index
+    
+    lookup = {item['name'].lower(): item for items in menu.values() for item in items}
+    
+    names = list(lookup)
+    trigram_positions = {}
+    short_positions = []
+    for position, name in enumerate(names):
+        if len(name) < 3:
+            short_positions.append(position)
+        for gram in _trigrams(name):
+            trigram_positions.setdefault(gram, []).append(position)
+    
+    _menu_index = (lookup, names, trigram_positions, short_positions)
+    _menu_cache = menu
+
+
+def _find_partial_match(item_name_lower, menu_index):
+    """
+    Find the first menu item whose name contains, or is contained in, the given name
+    
+    Any such name shares at least one trigram with the requested name (or is too short
+    to have one), so only those candidates are checked, in menu order. All lookups use
+    the one menu_index snapshot passed in.
+    """
+    menu_lookup, names, trigram_positions, short_positions = menu_index
+    if len(item_name_lower) < 3:
+        candidates = names
+    else:
+        positions = set(short_positions)
+        for gram in _trigrams(item_name_lower):
+            positions.update(trigram_positions.get(gram, ()))
+        candidates = [names[position] for position in sorted(positions)]
+    
+    for menu_item_name in candidates:
+        if item_name_lower in menu_item_name or menu_item_name in item_name_lower:
+            return menu_lookup[menu_item_name]
+    return None
+
 def get_menu():
     """
     Get the room service menu
@@ -17,20 +85,26 @@ def get_menu():
     Returns:
         dict: Menu items organized by category
     """
-    global _menu_cache
-    
     # Return cached menu if available
     if _menu_cache:
         return _menu_cache
     
+    with _menu_lock:
+        # Another thread may have loaded the menu while we waited
+        if _menu_cache:
+            return _menu_cache
+        return _load_menu()
+
+
+def _load_menu():
+    """Load the menu from file (or the default menu) into the caches; caller holds _menu_lock"""
     try:
         # Load menu from file
-        file_path = os.path.join('data', 'menu.json')
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
+        if os.path.exists(_MENU_FILE):
+            with open(_MENU_FILE, 'r', encoding='utf-8') as f:
                 menu = json.load(f)
-                _menu_cache = menu
-                return menu
+            _cache_menu(menu)
+            return menu
         
         # If file doesn't exist, provide a default menu
         default_menu = {
@@ -67,7 +141,7 @@ def get_menu():
             ]
         }
         
-        _menu_cache = default_menu
+        _cache_menu(default_menu)
         return default_menu
         
     except Exception as e:
@@ -75,6 +149,44 @@ def get_menu():
         return {}
 
 
+def _get_menu_index():
+    """
+    Get the current menu lookup/partial-match snapshot, loading the menu if needed
+    
+    Returns:
+        tuple: (items keyed by lowercase name, names, trigram positions, short positions)
+    """
+    if _menu_index is None:
+        get_menu()
+    return _menu_index or ({}, [], {}, [])
+
+
+def _get_guest_room_number(guest_id):
+    """
+    Get the room number of a guest, cached for a short time
+    
+    Args:
+        guest_id (int): ID of the guest
+        
+    Returns:
+        str: Room number, or None if the guest does not exist
+    """
+    now = time.time()
+    cached = _guest_room_cache.get(guest_id)
+    if cached and now - cached[1] < GUEST_ROOM_CACHE_TTL:
+        return cached[0]
+    
+    guest = db.session.get(Guest, guest_id)
+    if not guest:
+        return None
+    
+    # Evict the oldest entry when the cache is full
+    if len(_guest_room_cache) >= GUEST_ROOM_CACHE_SIZE and guest_id not in _guest_room_cache:
+        _guest_room_cache.pop(next(iter(_guest_room_cache)), None)
+    _guest_room_cache[guest_id] = (guest.room_number, now)
+    return guest.room_number
+
+
 def place_order(guest_id, items, special_instructions=''):
     """
     Place a room service order
@@ -89,19 +201,13 @@ def place_order(guest_id, items, special_instructions=''):
     """
     try:
         # Get the guest
-        guest = Guest.query.get(guest_id)
-        if not guest:
+        room_number = _get_guest_room_number(guest_id)
+        if room_number is None:
             raise ValueError(f"Guest with ID {guest_id} not found")
         
-        # Validate items against the menu
-        menu = get_menu()
-        all_menu_items = []
-        
-        for category in menu.values():
-            all_menu_items.extend(category)
-        
-        # Convert menu items to a dict by name for easy lookup
-        menu_lookup = {item['name'].lower(): item for item in all_menu_items}
+        # Validate items against one snapshot of the menu, indexed by lowercase name
+        menu_index = _get_menu_index()
+        menu_lookup = menu_index[0]
         
         # Normalize and validate order items
         order_items = []
@@ -116,11 +222,15 @@ def place_order(guest_id, items, special_instructions=''):
             if item_name_lower in menu_lookup:
                 matching_item = menu_lookup[item_name_lower]
             else:
-                # Try partial matching
-                for menu_item_name, menu_item in menu_lookup.items():
-                    if item_name_lower in menu_item_name or menu_item_name in item_name_lower:
-                        matching_item = menu_item
-                        break
+                # Try partial matching, then a fuzzy match for misspelled names
+                matching_item = _find_partial_match(item_name_lower, menu_index)
+                if not matching_item:
+                    # A high cutoff only accepts typos; a different item with a price must never
+                    # stand in for an off-menu request (e.g. "hamburguesa vegana")
+                    close_matches = get_close_matches(item_name_lower, menu_lookup.keys(), n=1, cutoff=0.85)
+                    if close_matches:
+                        matching_item = menu_lookup[close_matches[0]]
+                        logger.warning(f"Fuzzy-matched menu item '{item_name}' to '{matching_item['name']}'")
             
             if matching_item:
                 order_items.append({
@@ -141,8 +251,8 @@ def place_order(guest_id, items, special_instructions=''):
         # Create the order
         new_order = RoomServiceOrder(
             guest_id=guest_id,
-            room_number=guest.room_number,
-            order_items=json.dumps(order_items),
+            room_number=room_number,
+            order_items=order_items,
             special_instructions=special_instructions,
             total_price=total_price
         )
@@ -169,28 +279,57 @@ def get_order_status(order_id):
         dict: Order status information
     """
     try:
-        order = RoomServiceOrder.query.get(order_id)
+        order = db.session.get(RoomServiceOrder, order_id)
         if not order:
             raise ValueError(f"Order with ID {order_id} not found")
         
-        # Parse order items from JSON
-        items = json.loads(order.order_items) if order.order_items else []
-        
-        return {
-            'id': order.id,
-            'status': order.status,
-            'room_number': order.room_number,
-            'order_date': order.order_date.isoformat(),
-            'items': items,
-            'special_instructions': order.special_instructions,
-            'total_price': order.total_price
-        }
+        return _order_to_dict(order)
         
     except Exception as e:
         logger.error(f"Error getting order status: {str(e)}")
         return None
 
 
+def get_order_statuses(order_ids):
+    """
+    Get the status of several room service orders with a single query
+    
+    Args:
+        order_ids (list): IDs of the orders
+        
+    Returns:
+        dict: Order status information keyed by order ID (missing orders are omitted)
+    """
+    if not order_ids:
+        return {}
+    
+    try:
+        orders = RoomServiceOrder.query.filter(RoomServiceOrder.id.in_(set(order_ids))).all()
+        return {order.id: _order_to_dict(order) for order in orders}
+        
+    except Exception as e:
+        logger.error(f"Error getting order statuses: {str(e)}")
+        return {}
+
+
+def _order_to_dict(order):
+    """Convert a RoomServiceOrder to its status dictionary"""
+    # Rows written before order_items became a JSON column may still hold a JSON string
+    items = order.order_items or []
+    if isinstance(items, str):
+        items = json.loads(items)
+    
+    return {
+        'id': order.id,
+        'status': order.status,
+        'room_number': order.room_number,
+        'order_date': order.order_date.isoformat(),
+        'items': items,
+        'special_instructions': order.special_instructions,
+        'total_price': order.total_price
+    }
+
+
 def update_order_status(order_id, new_status):
     """
     Update the status of a room service order
@@ -203,13 +342,12 @@ def update_order_status(order_id, new_status):
         bool: Success or failure
     """
     try:
-        order = RoomServiceOrder.query.get(order_id)
+        order = db.session.get(RoomServiceOrder, order_id)
         if not order:
             raise ValueError(f"Order with ID {order_id} not found")
         
-        valid_statuses = ['pending', 'in-progress', 'delivered', 'cancelled']
-        if new_status not in valid_statuses:
-            raise ValueError(f"Invalid status: {new_status}. Must be one of {valid_statuses}")
+        if new_status not in _VALID_ORDER_STATUSES:
+            raise ValueError(f"Invalid status: {new_status}. Must be one of {list(_ORDER_STATUSES)}")
         
         order.status = new_status
         db.session.commit()
@@ -1,12 +1,22 @@
 import logging
+import re
 from datetime import datetime, timedelta
-import dateutil.parser
+from functools import lru_cache
 from app import db
 from models import Guest, TransportationRequest
 from services.vapi_service import make_transportation_arrival_call, make_transportation_confirmation_call
 
 logger = logging.getLogger(__name__)
 
+# Digits of a relative offset such as "en 30 minutos"
+_DIGITS_RE = re.compile(r'\d+')
+
+# Relative time keywords and the kind of offset they indicate, in priority order
+_RELATIVE_KEYWORDS = (('minuto', 'minutes'), ('hora', 'hours'), ('mañana', 'tomorrow'))
+
+# Most common fixed formats, tried before falling back to dateutil
+_ABSOLUTE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M")
+
 def schedule_transportation(guest_id, pickup_time, destination, num_passengers=1, vehicle_type='taxi', special_notes=''):
     """
     Schedule transportation for a guest
@@ -90,30 +100,23 @@ def parse_pickup_time(pickup_time):
         datetime: Parsed datetime object
     """
     try:
-        # Try to parse as ISO format first
-        return dateutil.parser.parse(pickup_time)
+        # Try to parse as an absolute date/time first
+        return _parse_absolute(pickup_time)
     except:
-        # Handle relative time expressions
-        now = datetime.now()
+        # Handle relative time expressions; relative results are whole seconds
+        now = datetime.now().replace(microsecond=0)
         lower_time = pickup_time.lower()
         
-        if "minuto" in lower_time or "minutos" in lower_time:
-            # e.g., "en 30 minutos"
-            try:
-                minutes = int(''.join(c for c in lower_time if c.isdigit()))
-                return now.replace(microsecond=0) + timedelta(minutes=minutes)
-            except:
-                pass
-                
-        elif "hora" in lower_time or "horas" in lower_time:
-            # e.g., "en 2 horas"
-            try:
-                hours = int(''.join(c for c in lower_time if c.isdigit()))
-                return now.replace(microsecond=0) + timedelta(hours=hours)
-            except:
-                pass
+        # First keyword present, in priority order
+        kind = next((kind for keyword, kind in _RELATIVE_KEYWORDS if keyword in lower_time), None)
+        
+        if kind == 'minutes' or kind == 'hours':
+            # e.g., "en 30 minutos" or "en 2 horas"
+            match = _DIGITS_RE.search(lower_time)
+            if match:
+                return now + timedelta(**{kind: int(match.group())})
                 
-        elif "mañana" in lower_time:
+        elif kind == 'tomorrow':
             # e.g., "mañana a las 10" or "mañana a las 10:30"
             try:
                 # Extract time part
@@ -148,7 +151,57 @@ def parse_pickup_time(pickup_time):
             
         # If all parsing attempts fail, default to 30 minutes from now
         logger.warning(f"Could not parse pickup time: {pickup_time}. Defaulting to 30 minutes from now.")
-        return now.replace(microsecond=0) + timedelta(minutes=30)
+        return now + timedelta(minutes=30)
+
+
+def _parse_absolute(pickup_time):
+    """
+    Parse an absolute date/time string, trying ISO 8601 and fixed formats before dateutil
+    
+    Args:
+        pickup_time (str): Time string
+        
+    Returns:
+        datetime: Parsed datetime object (raises if the string cannot be parsed)
+    """
+    parsed = _parse_full_date(pickup_time)
+    if parsed is not None:
+        return parsed
+    
+    # dateutil fills in missing parts (e.g. "14:30") from the current date,
+    # so its result is not cached. It is imported here so startup does not pay
+    # for loading it when the fast formats are enough
+    import dateutil.parser
+    return dateutil.parser.parse(pickup_time)
+
+
+@lru_cache(maxsize=256)
+def _parse_full_date(pickup_time):
+    """
+    Parse a string with a full date in ISO 8601 or one of the fixed formats
+    
+    The result depends only on the input, so it is cached for repeated strings.
+    
+    Args:
+        pickup_time (str): Time string
+        
+    Returns:
+        datetime: Parsed datetime object, or None if no format matches
+    """
+    # fromisoformat does not accept the 'Z' suffix before Python 3.11
+    iso_time = pickup_time[:-1] + '+00:00' if pickup_time.endswith('Z') else pickup_time
+    try:
+        return datetime.fromisoformat(iso_time)
+    except ValueError:
+        pass
+    
+    for fmt in _ABSOLUTE_FORMATS:
+        try:
+            return datetime.strptime(pickup_time, fmt)
+        except ValueError:
+            continue
+    
+    return None
 
 
 def get_transportation_request(request_id):
@@ -239,20 +292,27 @@ def get_upcoming_transportation_for_guest(guest_id):
     try:
         now = datetime.utcnow()
         
-        # Get future requests that are pending or confirmed
-        requests = TransportationRequest.query.filter(
+        # Get future requests that are pending or confirmed, selecting only the
+        # columns in the response instead of full ORM objects
+        rows = db.session.query(
+            TransportationRequest.id,
+            TransportationRequest.pickup_time,
+            TransportationRequest.destination,
+            TransportationRequest.vehicle_type,
+            TransportationRequest.status
+        ).filter(
             TransportationRequest.guest_id == guest_id,
             TransportationRequest.pickup_time > now,
             TransportationRequest.status.in_(['pending', 'confirmed'])
         ).order_by(TransportationRequest.pickup_time).all()
         
         return [{
-            'id': req.id,
-            'pickup_time': req.pickup_time.isoformat(),
-            'destination': req.destination,
-            'vehicle_type': req.vehicle_type,
-            'status': req.status
-        } for req in requests]
+            'id': request_id,
+            'pickup_time': pickup_time.isoformat(),
+            'destination': destination,
+            'vehicle_type': vehicle_type,
+            'status': status
+        } for request_id, pickup_time, destination, vehicle_type, status in rows]
         
     except Exception as e:
         logger.error(f"Error getting upcoming transportation: {str(e)}")
@@ -1,6 +1,12 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+import string
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from datetime import datetime
+from sqlalchemy import select
 from models import Guest, TransportationRequest
 from app import db
 import logging
@@ -13,62 +19,37 @@ VAPI_BASE_URL = "https://api.vapi.ai/call/phone"
 PHONE_NUMBER_ID = os.environ.get("VAPI_PHONE_NUMBER_ID") 
 USER_PHONE_NUMBER = str(os.environ.get("USER_PHONE_NUMBER")) 
 
+_HEADERS = {
+    'Authorization': f'Bearer {VAPI_TOKEN}',
+    'Content-Type': 'application/json',
+}
 
-def make_transportation_confirmation_call(request_id):
-    """
-    Make a confirmation call for a transportation request using Vapi
-    
-    Args:
-        request_id (int): ID of the transportation request
-    
-    Returns:
-        dict: Call details including call_id
-    """
-    try:
-        # Get the transportation request
-        request = TransportationRequest.query.get(request_id)
-        if not request:
-            raise ValueError(f"Transportation request with ID {request_id} not found")
-        
-        # Get the guest
-        guest = Guest.query.get(request.guest_id)
-        if not guest:
-            raise ValueError(f"Guest with ID {request.guest_id} not found")
-        
-        '''if not guest.phone_number:
-            raise ValueError(f"No phone number found for guest {guest.name}")'''
-        
-        # Format pickup time
-        pickup_time = request.pickup_time.strftime("%I:%M %p")
-        
-        # Create headers
-        headers = {
-            'Authorization': f'Bearer {VAPI_TOKEN}',
-            'Content-Type': 'application/json',
-        }
-        
-        # Create the data payload
-        data = {
-            'assistant': {
-                "firstMessage": "Hello, this is the hotel transportation service.",
-                "model": {
-                    "provider": "openai",
-                    "model": "gpt-3.5-turbo",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": f"""
+# Shared session so calls to Vapi reuse pooled TLS connections. Only connection
+# failures are retried, so a call that Vapi already created is never placed twice
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2)
+))
+
+# Vapi calls are sent in the background so they do not block the web request
+_call_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='vapi-call')
+
+
+# Assistant prompts, parsed once when the module loads
+_CONFIRMATION_PROMPT = string.Template("""
                             Eres un asistente del servicio de transporte del hotel llamando para confirmar una solicitud de transporte.
                             
                             Detalles del huésped:
-                            - Nombre: {guest.name}
-                            - Habitación: {guest.room_number}
+                            - Nombre: $guest_name
+                            - Habitación: $room_number
                             
                             Detalles del transporte:
-                            - Hora de recogida: {pickup_time}
-                            - Destino: {request.destination}
-                            - Tipo de vehículo: {request.vehicle_type}
-                            - Número de pasajeros: {request.num_passengers}
+                            - Hora de recogida: $pickup_time
+                            - Destino: $destination
+                            - Tipo de vehículo: $vehicle_type
+                            - Número de pasajeros: $num_passengers
                             
                             Por favor:
                             1. Preséntate como el servicio de transporte del hotel
@@ -77,39 +58,207 @@ def make_transportation_confirmation_call(request_id):
                             4. Agradéceles y confirma que el servicio está programado
                             
                             Habla de manera natural y profesional. Si necesitan modificar algo, anótalo e infórmales que el conserje se pondrá en contacto con ellos.
-                            """
-                        }
-                    ]
-                },
-                "voice": "jennifer-playht"
-            },
-            'phoneNumberId': PHONE_NUMBER_ID,
-            'customer': {
-                #'number': guest.phone_number,
-                'number': USER_PHONE_NUMBER,
+                            """)
+
+_ARRIVAL_PROMPT = string.Template("""
+                            Eres un asistente del servicio de transporte del hotel llamando para notificar a un huésped que su transporte ha llegado.
+                            
+                            Detalles del huésped:
+                            - Nombre: $guest_name
+                            - Habitación: $room_number
+                            
+                            Detalles del transporte:
+                            - Tipo de vehículo: $vehicle_type
+                            - Destino: $destination
+                            
+                            Por favor:
+                            1. Preséntate como el servicio de transporte del hotel
+                            2. Informa al huésped que su $vehicle_type ha llegado
+                            3. Indícales que pueden proceder al lobby/punto de recogida
+                            4. Deséales un buen viaje
+                            
+                            Habla de manera natural y profesional. Si tienen alguna pregunta, bríndales asistencia.
+                            """)
+
+
+def _fmt_12h(dt):
+    """Format a datetime as a 12-hour clock time, e.g. '03:30 PM' (same as strftime("%I:%M %p"))"""
+    hour = dt.hour % 12 or 12
+    return f"{hour:02d}:{dt.minute:02d} {'AM' if dt.hour < 12 else 'PM'}"
+
+
+def _build_call_payload(model, voice, content):
+    """
+    Build the Vapi call payload for a transportation assistant
+    
+    Args:
+        model (str): OpenAI model used by the assistant
+        voice (str): Assistant voice
+        content (str): System prompt for the assistant
+    
+    Returns:
+        dict: Call payload
+    """
+    return {
+        'assistant': {
+            "firstMessage": "Hello, this is the hotel transportation service.",
+            "model": {
+                "provider": "openai",
+                "model": model,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": content
+                    }
+                ]
             },
-        }
-        
-        # Make the API request
-        response = requests.post(VAPI_BASE_URL, headers=headers, json=data)
+            "voice": voice
+        },
+        'phoneNumberId': PHONE_NUMBER_ID,
+        'customer': {
+            #'number': guest.phone_number,
+            'number': USER_PHONE_NUMBER,
+        },
+    }
+
+
+def _fetch_call_details(request_id):
+    """
+    Get the transportation request and guest fields used in a call with a single query
+    
+    Args:
+        request_id (int): ID of the transportation request
+    
+    Returns:
+        Row: pickup_time, destination, vehicle_type, num_passengers, guest_name and room_number
+    """
+    row = db.session.execute(
+        select(
+            TransportationRequest.pickup_time,
+            TransportationRequest.destination,
+            TransportationRequest.vehicle_type,
+            TransportationRequest.num_passengers,
+            Guest.name.label('guest_name'),
+            Guest.room_number
+        ).join(
+            Guest, Guest.id == TransportationRequest.guest_id
+        ).where(TransportationRequest.id == request_id)
+    ).first()
+    
+    if row is None:
+        raise ValueError(f"Transportation request with ID {request_id} not found")
+    
+    return row
+
+
+def _fire_call(data, request_id, call_kind):
+    """
+    Send a call request to Vapi; runs on _call_executor
+    
+    Args:
+        data (dict): Call payload
+        request_id (int): ID of the transportation request, for logging
+        call_kind (str): Kind of call, for logging
+    
+    Returns:
+        dict: Outcome read by _log_call_outcome, with success and either
+            call_id and status, or error
+    """
+    try:
+        response = _session.post(VAPI_BASE_URL, headers=_HEADERS, json=data, timeout=(3, 10))
         
         if response.status_code == 201:
             call_data = response.json()
-            logger.info(f"Initiated confirmation call for transportation request {request_id}, call ID: {call_data.get('id')}")
-            
             return {
                 "success": True,
                 "call_id": call_data.get('id'),
                 "status": call_data.get('status')
             }
         else:
-            error_msg = f"Failed to create call: {response.text}"
-            logger.error(error_msg)
             return {
                 "success": False,
-                "error": error_msg
+                "error": f"Failed to create call: {response.text}"
             }
         
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
+def _log_call_outcome(request_id, call_kind, future):
+    """
+    Log the outcome of a background Vapi call against its transportation request
+    
+    Args:
+        request_id (int): ID of the transportation request
+        call_kind (str): Kind of call
+        future (Future): The finished _fire_call task
+    """
+    exc = future.exception()
+    result = {"success": False, "error": str(exc)} if exc else future.result()
+    
+    if result["success"]:
+        logger.info(f"Initiated {call_kind} call for transportation request {request_id}, call ID: {result['call_id']}")
+    else:
+        # The call never went out; log it so the concierge can place it by hand
+        logger.error(f"{call_kind.capitalize()} call for transportation request {request_id} was not placed: {result['error']}")
+
+
+def _submit_call(data, request_id, call_kind):
+    """
+    Send a call to Vapi in the background and log its outcome when it finishes
+    
+    Args:
+        data (dict): Call payload
+        request_id (int): ID of the transportation request
+        call_kind (str): Kind of call
+    """
+    future = _call_executor.submit(_fire_call, data, request_id, call_kind)
+    future.add_done_callback(partial(_log_call_outcome, request_id, call_kind))
+
+
+def make_transportation_confirmation_call(request_id):
+    """
+    Make a confirmation call for a transportation request using Vapi
+    
+    Args:
+        request_id (int): ID of the transportation request
+    
+    Returns:
+        dict: Call submission status ("queued" once the call is sent in the background)
+    """
+    try:
+        # Get the transportation request and guest details
+        details = _fetch_call_details(request_id)
+        
+        '''if not guest.phone_number:
+            raise ValueError(f"No phone number found for guest {guest.name}")'''
+        
+        # Format pickup time
+        pickup_time = _fmt_12h(details.pickup_time)
+        
+        # Create the data payload
+        content = _CONFIRMATION_PROMPT.substitute(
+            guest_name=details.guest_name,
+            room_number=details.room_number,
+            pickup_time=pickup_time,
+            destination=details.destination,
+            vehicle_type=details.vehicle_type,
+            num_passengers=details.num_passengers
+        )
+        data = _build_call_payload("gpt-3.5-turbo", "jennifer-playht", content)
+        
+        # Make the API request in the background; _log_call_outcome logs the result
+        # against the request and the call status arrives later through handle_call_webhook
+        _submit_call(data, request_id, "confirmation")
+        
+        return {
+            "success": True,
+            "status": "queued"
+        }
+        
     except Exception as e:
         logger.error(f"Error making confirmation call: {str(e)}")
         return {
@@ -125,88 +274,32 @@ def make_transportation_arrival_call(request_id):
         request_id (int): ID of the transportation request
     
     Returns:
-        dict: Call details including call_id
+        dict: Call submission status ("queued" once the call is sent in the background)
     """
     try:
-        # Get the transportation request
-        request = TransportationRequest.query.get(request_id)
-        if not request:
-            raise ValueError(f"Transportation request with ID {request_id} not found")
-        
-        # Get the guest
-        guest = Guest.query.get(request.guest_id)
-        if not guest:
-            raise ValueError(f"Guest with ID {request.guest_id} not found")
+        # Get the transportation request and guest details
+        details = _fetch_call_details(request_id)
         
         '''if not guest.phone_number:
             raise ValueError(f"No phone number found for guest {guest.name}")'''
         
-        # Create headers
-        headers = {
-            'Authorization': f'Bearer {VAPI_TOKEN}',
-            'Content-Type': 'application/json',
-        }
-        
         # Create the data payload
-        data = {
-            'assistant': {
-                "firstMessage": "Hello, this is the hotel transportation service.",
-                "model": {
-                    "provider": "openai",
-                    "model": "gpt-4",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": f"""
-                            Eres un asistente del servicio de transporte del hotel llamando para notificar a un huésped que su transporte ha llegado.
-                            
-                            Detalles del huésped:
-                            - Nombre: {guest.name}
-                            - Habitación: {guest.room_number}
-                            
-                            Detalles del transporte:
-                            - Tipo de vehículo: {request.vehicle_type}
-                            - Destino: {request.destination}
-                            
-                            Por favor:
-                            1. Preséntate como el servicio de transporte del hotel
-                            2. Informa al huésped que su {request.vehicle_type} ha llegado
-                            3. Indícales que pueden proceder al lobby/punto de recogida
-                            4. Deséales un buen viaje
-                            
-                            Habla de manera natural y profesional. Si tienen alguna pregunta, bríndales asistencia.
-                            """
-                        }
-                    ]
-                },
-                "voice": "alloy"
-            },
-            'phoneNumberId': PHONE_NUMBER_ID,
-            'customer': {
-                #'number': guest.phone_number,
-                'number': USER_PHONE_NUMBER,
-            },
-        }
+        content = _ARRIVAL_PROMPT.substitute(
+            guest_name=details.guest_name,
+            room_number=details.room_number,
+            destination=details.destination,
+            vehicle_type=details.vehicle_type
+        )
+        data = _build_call_payload("gpt-4", "alloy", content)
         
-        # Make the API request
-        response = requests.post(VAPI_BASE_URL, headers=headers, json=data)
+        # Make the API request in the background; _log_call_outcome logs the result
+        # against the request and the call status arrives later through handle_call_webhook
+        _submit_call(data, request_id, "arrival notification")
         
-        if response.status_code == 201:
-            call_data = response.json()
-            logger.info(f"Initiated arrival notification call for transportation request {request_id}, call ID: {call_data.get('id')}")
-            
-            return {
-                "success": True,
-                "call_id": call_data.get('id'),
-                "status": call_data.get('status')
-            }
-        else:
-            error_msg = f"Failed to create call: {response.text}"
-            logger.error(error_msg)
-            return {
-                "success": False,
-                "error": error_msg
-            }
+        return {
+            "success": True,
+            "status": "queued"
+        }
         
     except Exception as e:
         logger.error(f"Error making arrival notification call: {str(e)}")
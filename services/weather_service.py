@@ -1,7 +1,9 @@
 import logging
 import json
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from config import OPENWEATHER_API_KEY, WEATHER_UPDATE_INTERVAL, HOTEL_COORDINATES
 
@@ -10,10 +12,27 @@ logger = logging.getLogger(__name__)
 # Caché para almacenar datos de clima
 weather_cache = {
     "last_update": 0,
+    "last_forecast_update": 0,
     "current": None,
     "forecast": None
 }
 
+# Serializa las actualizaciones del caché para que solo un hilo regenere los datos
+_weather_lock = threading.Lock()
+
+# La escritura del archivo de referencia se hace fuera del camino de la petición;
+# un único hilo mantiene las escrituras en orden
+_io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='weather-io')
+_WEATHER_FILE = os.path.join('data', 'weather.json')
+os.makedirs(os.path.dirname(_WEATHER_FILE), exist_ok=True)
+
+
+def _is_cache_fresh(data_key, update_key, current_time):
+    """Check whether a weather cache entry exists and has not expired"""
+    return (weather_cache[data_key] is not None and
+            current_time - weather_cache[update_key] <= WEATHER_UPDATE_INTERVAL)
+
+
 def get_current_weather():
     """
     Get current weather for the hotel location
@@ -22,10 +41,15 @@ def get_current_weather():
         dict: Weather information including temperature, condition, humidity, etc.
     """
     try:
-        # Verificar si necesitamos actualizar el caché
+        # Verificar si necesitamos actualizar el caché (sin bloqueo si sigue vigente)
         current_time = time.time()
-        if (current_time - weather_cache["last_update"] > WEATHER_UPDATE_INTERVAL or 
-            weather_cache["current"] is None):
+        if _is_cache_fresh("current", "last_update", current_time):
+            return weather_cache["current"]
+        
+        with _weather_lock:
+            # Otro hilo pudo haber actualizado el caché mientras esperábamos
+            if _is_cache_fresh("current", "last_update", time.time()):
+                return weather_cache["current"]
             
             # Para este ejemplo, proporcionamos datos de prueba
             # En una implementación real, haríamos una llamada a la API de OpenWeather
@@ -43,7 +67,7 @@ def get_current_weather():
                 "sunrise": "06:05",
                 "sunset": "18:20",
                 "uv_index": 5,
-                "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                "updated_at": datetime.now().isoformat(sep=" ", timespec="seconds")
             }
             
             # Actualizar el caché
@@ -51,7 +75,7 @@ def get_current_weather():
             weather_cache["last_update"] = current_time
             
             # Guardar los datos en un archivo para referencia
-            _save_weather_data(weather_data)
+            _io_executor.submit(_save_weather_data, weather_data)
             
         return weather_cache["current"]
         
@@ -65,7 +89,7 @@ def get_current_weather():
             "icon": "cloud",
             "humidity": 50,
             "wind_speed": 5,
-            "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "updated_at": datetime.now().isoformat(sep=" ", timespec="seconds")
         }
 
 def get_weather_forecast(days=3):
@@ -79,32 +103,37 @@ def get_weather_forecast(days=3):
         list: Daily forecast data
     """
     try:
-        # Verificar si necesitamos actualizar el caché
+        # Verificar si necesitamos actualizar el caché (sin bloqueo si sigue vigente)
         current_time = time.time()
-        if (current_time - weather_cache["last_update"] > WEATHER_UPDATE_INTERVAL or 
-            weather_cache["forecast"] is None):
-            
-            # Datos de prueba para demostración
-            forecast_data = []
+        if _is_cache_fresh("forecast", "last_forecast_update", current_time):
+            return weather_cache["forecast"]
+        
+        with _weather_lock:
+            # Otro hilo pudo haber actualizado el caché mientras esperábamos
+            if _is_cache_fresh("forecast", "last_forecast_update", time.time()):
+                return weather_cache["forecast"]
             
-            # Generar datos para los próximos días
-            for i in range(days):
-                day = datetime.now() + timedelta(days=i+1)
-                day_forecast = {
-                    "date": day.strftime("%Y-%m-%d"),
+            # Datos de prueba para demostración, generados para los próximos días
+            now = datetime.now()
+            forecast_days = [now + timedelta(days=i+1) for i in range(days)]
+            forecast_data = [
+                {
+                    "date": day.date().isoformat(),
                     "day_name": day.strftime("%A"),
                     "temperature_max": 28 + (i % 3) - 1,
                     "temperature_min": 20 + (i % 2),
-                    "condition": _get_random_condition(i),
-                    "icon": _get_icon_for_condition(_get_random_condition(i)),
+                    "condition": (condition := _get_random_condition(i)),
+                    "icon": _get_icon_for_condition(condition),
                     "humidity": 45 + (i * 5) % 15,
                     "wind_speed": 5 + (i * 2) % 8,
                     "chance_of_rain": (i * 10) % 40
                 }
-                forecast_data.append(day_forecast)
+                for i, day in enumerate(forecast_days)
+            ]
             
             # Actualizar el caché
             weather_cache["forecast"] = forecast_data
+            weather_cache["last_forecast_update"] = current_time
             
         return weather_cache["forecast"]
         
@@ -113,7 +142,7 @@ def get_weather_forecast(days=3):
         # Devolver datos por defecto en caso de error
         return [
             {
-                "date": (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d"),
+                "date": (datetime.now() + timedelta(days=1)).date().isoformat(),
                 "day_name": (datetime.now() + timedelta(days=1)).strftime("%A"),
                 "temperature_max": 26,
                 "temperature_min": 19,
@@ -127,32 +156,34 @@ def get_weather_forecast(days=3):
 def _save_weather_data(data):
     """Save weather data to file for reference"""
     try:
-        data_dir = os.path.join('data')
-        os.makedirs(data_dir, exist_ok=True)
-        
-        with open(os.path.join(data_dir, 'weather.json'), 'w', encoding='utf-8') as f:
+        # Escribir a un archivo temporal y renombrarlo para no dejar un JSON a medias
+        tmp_path = _WEATHER_FILE + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, _WEATHER_FILE)
     except Exception as e:
         logger.error(f"Error saving weather data: {str(e)}")
 
+_DEMO_CONDITIONS = (
+    "Soleado", 
+    "Parcialmente nublado", 
+    "Nublado", 
+    "Lluvioso", 
+    "Tormenta eléctrica"
+)
+
+_ICON_MAPPING = {
+    "Soleado": "sun",
+    "Parcialmente nublado": "cloud-sun",
+    "Nublado": "cloud",
+    "Lluvioso": "cloud-rain",
+    "Tormenta eléctrica": "cloud-lightning"
+}
+
 def _get_random_condition(day_index):
     """Get a random weather condition for demo purposes"""
-    conditions = [
-        "Soleado", 
-        "Parcialmente nublado", 
-        "Nublado", 
-        "Lluvioso", 
-        "Tormenta eléctrica"
-    ]
-    return conditions[day_index % len(conditions)]
+    return _DEMO_CONDITIONS[day_index % len(_DEMO_CONDITIONS)]
 
 def _get_icon_for_condition(condition):
     """Map condition to icon name"""
-    icon_mapping = {
-        "Soleado": "sun",
-        "Parcialmente nublado": "cloud-sun",
-        "Nublado": "cloud",
-        "Lluvioso": "cloud-rain",
-        "Tormenta eléctrica": "cloud-lightning"
-    }
-    return icon_mapping.get(condition, "cloud")
\ No newline at end of file
+    return _ICON_MAPPING.get(condition, "cloud")
\ No newline at end of file
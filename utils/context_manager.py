@@ -1,5 +1,21 @@
+import re
 from datetime import datetime
 
+# Terms that shouldn't be treated as valid destinations
+_AMBIGUOUS = frozenset({'ahi', 'alla', 'aca', 'aqui', 'there', 'here'})
+
+# Common prefixes to remove; longer alternatives first so the longest one matches
+_PREFIX_RE = re.compile(
+    r'^(?:quiero ir a la|quiero ir al|quiero ir a|ir a la|ir al|ir a|'
+    r'voy a la|voy al|voy a|para|hacia|hasta)(?:\s+|$)'
+)
+
+# Leading articles
+_ARTICLE_RE = re.compile(r'^(?:el|la|los|las)\s+')
+
+# Context entry keys worth preserving when the context is compacted
+_IMPORTANT_KEYS = frozenset({'destination', 'restaurant', 'place_type', 'time', 'date'})
+
 def update_context(context, intent, entities):
     """
     Update conversation context based on current intent and entities
@@ -36,64 +52,47 @@ def update_context(context, intent, entities):
     # Add new entry to context
     context.append(current_entry)
     
-    # Limit context size while preserving critical information
-    if len(context) > 10:
-        # Keep only the most recent entries that contain important keys
-        important_keys = ['destination', 'restaurant', 'place_type', 'time', 'date']
-        preserved_entries = []
-        
-        # Preserve entries with important information
-        for entry in reversed(context):
-            if any(key in entry for key in important_keys):
-                preserved_entries.append(entry)
-                if len(preserved_entries) >= 5:  # Keep at most 5 important entries
-                    break
-                    
-        # Keep the 5 most recent entries regardless of content
-        recent_entries = context[-5:]
-        
-        # Combine preserved and recent entries, remove duplicates
-        new_context = list({entry['timestamp']: entry for entry in preserved_entries + recent_entries}.values())
-        new_context.sort(key=lambda x: x['timestamp'])  # Sort by timestamp
-        context = new_context[-10:]  # Keep at most 10 entries
+    # Nothing to compact while the context is within its limit
+    if len(context) <= 10:
+        return context
     
-    return context
+    # Limit context size while preserving critical information:
+    # keep the 5 most recent entries regardless of content
+    last = len(context)
+    keep = set(range(last - 5, last))
+    
+    # Preserve the 5 most recent entries with important information
+    important_found = 0
+    for index in range(last - 1, -1, -1):
+        if not _IMPORTANT_KEYS.isdisjoint(context[index]):
+            keep.add(index)
+            important_found += 1
+            if important_found >= 5:
+                break
+    
+    # Entries are appended in chronological order, so a single in-order pass
+    # keeps them sorted by timestamp; the dict removes duplicate timestamps
+    return list({entry['timestamp']: entry
+                 for index, entry in enumerate(context) if index in keep}.values())
 
 def validate_destination(destination):
     """
     Validate and clean destination data
     Returns: (is_valid, cleaned_destination)
     """
-    if not destination:
+    # Too short to be a destination even before cleaning
+    if not destination or len(destination) < 2:
         return False, None
         
-    # List of ambiguous terms that shouldn't be treated as valid destinations
-    ambiguous_terms = ['ahi', 'alla', 'aca', 'aqui', 'there', 'here']
-    
-    # Common prefixes to remove
-    prefixes_to_remove = [
-        'quiero ir a', 'quiero ir al', 'quiero ir a la', 
-        'ir a', 'ir al', 'ir a la',
-        'voy a', 'voy al', 'voy a la',
-        'para', 'hacia', 'hasta'
-    ]
-    
     # Clean the destination string
     cleaned_dest = destination.lower().strip()
     
-    # Remove common prefixes
-    for prefix in prefixes_to_remove:
-        if cleaned_dest.startswith(prefix):
-            cleaned_dest = cleaned_dest[len(prefix):].strip()
-            
-    # Remove leading articles if they exist
-    articles = ['el ', 'la ', 'los ', 'las ']
-    for article in articles:
-        if cleaned_dest.startswith(article):
-            cleaned_dest = cleaned_dest[len(article):].strip()
+    # Remove common prefixes and leading articles
+    cleaned_dest = _PREFIX_RE.sub('', cleaned_dest, count=1)
+    cleaned_dest = _ARTICLE_RE.sub('', cleaned_dest, count=1)
     
     # Check if the destination is just an ambiguous term
-    if cleaned_dest in ambiguous_terms:
+    if cleaned_dest in _AMBIGUOUS:
         return False, None
         
     # Additional validation could be added here (e.g., minimum length, format checking)
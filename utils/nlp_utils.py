@@ -1,14 +1,100 @@
 import logging
 import re
-import json
-from datetime import datetime, timedelta
-import random
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
 # Since we don't have direct access to spaCy in this implementation,
 # we'll create simplified NLP functions for the MVP
 
+# Maps accented vowels and ñ to plain ASCII so patterns only need the unaccented form
+_FOLD_TABLE = str.maketrans("áéíóúñÁÉÍÓÚÑ", "aeiounAEIOUN")
+
+# Intent patterns, in priority order for ties; written against accent-folded text
+_INTENTS_RAW = {
+    'greeting': [
+        r'\bhola\b', r'\bbuenos dias\b', r'\bbuenas tardes\b', r'\bbuenas noches\b',
+        r'^hi\b', r'^hey\b', r'\bsaludos\b', r'^holi\b', r'\bvolver\b'
+    ],
+    'farewell': [
+        r'\badios\b', r'\bchao\b', r'\bnos vemos\b', r'\bhasta luego\b',
+        r'\bhasta pronto\b'
+    ],
+    'thanks': [
+        r'\bgracias\b', r'\bte agradezco\b', r'\bmuchas gracias\b', r'\bgenial\b.*\bgracias\b',
+        r'\bperfecto\b.*\bgracias\b', r'\bexcelente\b.*\bgracias\b'
+    ],
+    'help': [
+        r'\bayuda\b', r'\bayudame\b', r'\bque puedes hacer\b', r'\bcomo funciona\b',
+        r'\bque haces\b', r'\bcomo te uso\b', r'\bpuedes ayudarme\b'
+    ],
+    'recommendation': [
+        r'\brecomienda\b', r'\bdonde\b.*\bcomer\b', r'\bdonde\b.*\bvisitar\b',
+        r'\bque\b.*\brecomiendas\b', r'\bsugieres\b', r'\balgo para\b.*\bvisitar\b',
+        r'\brestaurante\b', r'\bbar\b', r'\bcafe\b', r'\bmuseo\b', r'\bturismo\b',
+        r'\bparque\b', r'\batraccion\b', r'\bactividad\b', r'\bconocer\b'
+    ],
+    'room_service': [
+        r'\bservicio a la habitacion\b', r'\broom service\b', r'\bordenar\b.*\bcomida\b',
+        r'\bmenu\b', r'\bcomer\b.*\bhabitacion\b', r'\bpedir\b.*\bcomer\b',
+        r'\bquiero\b.*\bordenar\b', r'\bhambre\b', r'\btraer\b.*\bcomida\b',
+        r'\bdesayuno\b.*\bhabitacion\b'
+    ],
+    'transportation': [
+        r'\btaxi\b', r'\btransporte\b', r'\buber\b', r'\bcarro\b', r'\bvehiculo\b',
+        r'\bir\b.*\baeropuerto\b', r'\bir\b.*\bciudad\b', 
+        r'\bir (?:al?|hacia|para)\b', r'\bme gustaria ir\b',  # Catch "ir a/al/hacia" and "me gustaría ir"
+        r'\bviaje\b', r'\btraslado\b', r'\bcomo llegar\b', r'\bmovilizarme\b',
+        r'\ba las\b', r'\bpara las\b', r'\ben\b.*\bhoras?\b', r'\bmanana\b',
+        r'\b al \b', r'\b hacia \b'
+    ],
+    'weather': [
+        r'\bclima\b', r'\btiempo\b.*\bhoy\b', r'\bllover\b', r'\blluvia\b',
+        r'\btemperatura\b', r'\bcalor\b', r'\bfrio\b', r'\bnublado\b',
+        r'\bcomo esta\b.*\btiempo\b', r'\bpronostico\b'
+    ],
+    'faq': [
+        r'\bclave\b.*\bwifi\b', r'\bcontrasena\b.*\bwifi\b', r'\binternet\b',
+        r'\bdonde\b.*\bpiscina\b', r'\bdonde\b.*\bspa\b', r'\bdonde\b.*\bgym\b',
+        r'\bhorario\b.*\bdesayuno\b', r'\bhora\b.*\bcheck.?out\b', r'\bhora\b.*\bsalida\b',
+        r'\bque\b.*\bincluye\b', r'\bservicio\b.*\bincluido\b', r'\bpagar\b.*\bextra\b'
+    ]
+}
+
+# Patterns compiled once at import, each intent with a fused alternation of all its
+# patterns that rules the intent out in a single search before scoring pattern by pattern.
+# They run on accent-folded text, so they use re.ASCII for sre's faster \b and \w handling
+_INTENT_PATTERNS = tuple(
+    (
+        intent,
+        re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.ASCII),
+        tuple(re.compile(pattern, re.ASCII) for pattern in patterns)
+    )
+    for intent, patterns in _INTENTS_RAW.items()
+)
+
+
+def _context_key(context):
+    """
+    Read the context fields the classifier depends on, probing the dict once each
+    
+    Args:
+        context (dict): The current conversation context, or None
+        
+    Returns:
+        tuple: (current_intent, has_destination, has_pickup_time)
+    """
+    # Only these context fields affect classification, so they form the cache key
+    if not context:
+        return None, False, False
+    return context.get('current_intent'), bool(context.get('destination')), bool(context.get('pickup_time'))
+
+
+def _normalize(message):
+    """Lowercase, accent-fold and strip a message for intent classification"""
+    return message.lower().translate(_FOLD_TABLE).strip()
+
+
 def classify_intent(message, context=None):
     """
     Classify the intent of a user message, taking into account conversation context
@@ -22,120 +108,193 @@ def classify_intent(message, context=None):
     """
     logger.debug("\n" + "="*50)
     logger.debug("ENTERING classify_intent")
-    logger.debug(f"Message: {message}")
-    logger.debug(f"Context: {context}")
+    logger.debug("Message: %s", message)
+    logger.debug("Context: %s", context)
     
     # Normalize message
-    message = message.lower().strip()
-    logger.debug(f"Normalized message: {message}")
+    message = _normalize(message)
+    logger.debug("Normalized message: %s", message)
     
+    return _classify_intent_cached(message, *_context_key(context))
+
+
+def classify_intent_batch(messages, context=None):
+    """
+    Classify many messages at once, e.g. when replaying chat logs for analytics
+    
+    Args:
+        messages (iterable): The user messages
+        context (dict, optional): A conversation context shared by all messages
+        
+    Returns:
+        list: (intent, confidence) tuples in the same order as the messages
+    """
+    # Read the context once for the whole batch, and bypass the LRU so a log replay
+    # does not evict the entries kept hot by live chat traffic
+    context_key = _context_key(context)
+    classify = _classify_intent_cached.__wrapped__
+    return [classify(_normalize(message), *context_key) for message in messages]
+
+
+@lru_cache(maxsize=4096)
+def _classify_intent_cached(message, current_intent, has_destination, has_pickup_time):
+    """
+    Classify a normalized message; cached since chatbot traffic repeats a lot
+    
+    Args:
+        message (str): The normalized user message
+        current_intent (str): The current intent from context, if any
+        has_destination (bool): Whether the context already has a destination
+        has_pickup_time (bool): Whether the context already has a pickup time
+        
+    Returns:
+        tuple: (intent, confidence)
+    """
     # If we have context and are in the middle of a transportation request,
     # bias towards keeping the transportation intent
-    if context and context.get('current_intent') == 'transportation':
+    if current_intent == 'transportation':
         # If we're missing destination or pickup_time, this is likely still part of the transportation flow
-        if not context.get('destination') or not context.get('pickup_time'):
+        if not has_destination or not has_pickup_time:
             logger.debug("Continuing transportation intent from context")
             return 'transportation', 0.8
             
-    # Define intent patterns
-    intents = {
-        'greeting': [
-            r'\bhola\b', r'\bbuenos dias\b', r'\bbuenas tardes\b', r'\bbuenas noches\b',
-            r'^hi\b', r'^hey\b', r'\bsaludos\b', r'^holi\b', r'\bvolver\b'
-        ],
-        'farewell': [
-            r'\badios\b', r'\bchao\b', r'\bnos vemos\b', r'\bhasta luego\b',
-            r'\bhasta pronto\b', r'\badiós\b'
-        ],
-        'thanks': [
-            r'\bgracias\b', r'\bte agradezco\b', r'\bmuchas gracias\b', r'\bgenial\b.*\bgracias\b',
-            r'\bperfecto\b.*\bgracias\b', r'\bexcelente\b.*\bgracias\b'
-        ],
-        'help': [
-            r'\bayuda\b', r'\bayúdame\b', r'\bqué puedes hacer\b', r'\bcómo funciona\b',
-            r'\bqué haces\b', r'\bcómo te uso\b', r'\bpuedes ayudarme\b'
-        ],
-        'recommendation': [
-            r'\brecomienda\b', r'\bdónde\b.*\bcomer\b', r'\bdónde\b.*\bvisitar\b',
-            r'\bqué\b.*\brecomiendas\b', r'\bsugieres\b', r'\balgo para\b.*\bvisitar\b',
-            r'\brestaurante\b', r'\bbar\b', r'\bcafé\b', r'\bmuseo\b', r'\bturismo\b',
-            r'\bparque\b', r'\batracci[óo]n\b', r'\bactividad\b', r'\bconocer\b'
-        ],
-        'room_service': [
-            r'\bservicio a la habitaci[óo]n\b', r'\broom service\b', r'\bordenar\b.*\bcomida\b',
-            r'\bmen[úu]\b', r'\bcomer\b.*\bhabitaci[óo]n\b', r'\bpedir\b.*\bcomer\b',
-            r'\bquiero\b.*\bordenar\b', r'\bhambre\b', r'\btraer\b.*\bcomida\b',
-            r'\bdesayuno\b.*\bhabitaci[óo]n\b'
-        ],
-        'transportation': [
-            r'\btaxi\b', r'\btransporte\b', r'\buber\b', r'\bcarro\b', r'\bveh[íi]culo\b',
-            r'\bir\b.*\baeropuerto\b', r'\bir\b.*\bciudad\b', 
-            r'\bir (?:al?|hacia|para)\b', r'\bme gustar[íi]a ir\b',  # Catch "ir a/al/hacia" and "me gustaría ir"
-            r'\bviaje\b', r'\btraslado\b', r'\bcomo llegar\b', r'\bmovilizarme\b',
-            r'\ba las\b', r'\bpara las\b', r'\ben\b.*\bhoras?\b', r'\bma[ñn]ana\b',
-            r'\b al \b', r'\b hacia \b'
-        ],
-        'weather': [
-            r'\bclima\b', r'\btiempo\b.*\bhoy\b', r'\bllover\b', r'\blluvia\b',
-            r'\btemperatura\b', r'\bcalor\b', r'\bfr[íi]o\b', r'\bnublado\b',
-            r'\bcómo está\b.*\btiempo\b', r'\bpron[óo]stico\b'
-        ],
-        'faq': [
-            r'\bclave\b.*\bwifi\b', r'\bcontraseña\b.*\bwifi\b', r'\binternet\b',
-            r'\bdónde\b.*\bpiscina\b', r'\bdónde\b.*\bspa\b', r'\bdónde\b.*\bgym\b',
-            r'\bhorario\b.*\bdesayuno\b', r'\bhora\b.*\bcheck.?out\b', r'\bhora\b.*\bsalida\b',
-            r'\bqué\b.*\bincluye\b', r'\bservicio\b.*\bincluido\b', r'\bpagar\b.*\bextra\b'
-        ]
-    }
+    # Only build the list of matched patterns when debug logging is enabled
+    debug = logger.isEnabledFor(logging.DEBUG)
     
     # Check each intent pattern
     scores = {}
-    for intent, patterns in intents.items():
+    for intent, any_pattern, patterns in _INTENT_PATTERNS:
+        if not any_pattern.search(message):
+            continue
+        
         score = 0
-        matches = []
+        matches = [] if debug else None
         for pattern in patterns:
-            if re.search(pattern, message):
+            if pattern.search(message):
                 score += 1
-                matches.append(pattern)
+                if debug:
+                    matches.append(pattern.pattern)
         
         if score > 0:
             # Boost confidence for the current ongoing intent from context
-            if context and context.get('current_intent') == intent:
+            if current_intent == intent:
                 score += 1
             
             confidence = min(0.5 + (score * 0.1), 0.95)  # Scale confidence
             scores[intent] = confidence
-            logger.debug(f"Intent {intent} matched patterns: {matches}, score: {score}, confidence: {confidence}")
+            logger.debug("Intent %s matched patterns: %s, score: %s, confidence: %s", intent, matches, score, confidence)
     
     # If no matches but we have context, maintain the current intent with lower confidence
-    if not scores and context and context.get('current_intent'):
-        logger.debug(f"No matches found, maintaining context intent: {context.get('current_intent')}")
-        return context['current_intent'], 0.4
+    if not scores and current_intent:
+        logger.debug("No matches found, maintaining context intent: %s", current_intent)
+        return current_intent, 0.4
     
     # If still no matches, default to FAQ with low confidence
     if not scores:
         logger.debug("No matches found, defaulting to FAQ")
         return 'faq', 0.3
         
-    # Get the intent with highest confidence
-    max_intent = max(scores.items(), key=lambda x: x[1])
-    logger.debug(f"Selected intent: {max_intent[0]} with confidence: {max_intent[1]}")
-    return max_intent[0], max_intent[1]
+    # Get the intent with highest confidence; ties keep the first intent in priority order
+    max_intent = max(scores, key=scores.get)
+    logger.debug("Selected intent: %s with confidence: %s", max_intent, scores[max_intent])
+    return max_intent, scores[max_intent]
+
+
+# Pattern for a clock time with optional minutes and am/pm, or a relative "en N horas"
+_TIME_RE = re.compile(
+    r'\b(?P<h>\d{1,2})(?::(?P<m>\d{2}))?(?:\s*(?P<ap>[ap])\.?m\.?)?\b'
+    r'|\ben\s+(?P<hours>\d+)\s+horas?\b',
+    re.IGNORECASE | re.ASCII
+)
+
+# Recommendation categories and time periods, checked in order
+_CATEGORY_PATTERNS = (
+    (re.compile(r'\brestaurante\b|\bcomer\b|\bcomida\b|\bgastronomia\b', re.ASCII), 'restaurant'),
+    (re.compile(r'\bbar\b|\bbeber\b|\btrago\b|\bcoctel\b|\bcerveza\b|\bcerveceria\b', re.ASCII), 'bar'),
+    (re.compile(r'\bcafe\b|\bcafeteria\b', re.ASCII), 'cafe'),
+    (re.compile(r'\bmuseo\b|\barte\b|\bcultura\b|\bexhibicion\b', re.ASCII), 'museum'),
+    (re.compile(r'\bparque\b|\bplaza\b|\bjardin\b|\barea verde\b', re.ASCII), 'park'),
+    (re.compile(r'\bturismo\b|\batraccion\b|\blugar\b.*\bturistico\b|\bvisitar\b', re.ASCII), 'attraction'),
+    (re.compile(r'\bactividad\b|\bexperiencia\b|\btour\b|\bexcursion\b', re.ASCII), 'activity'),
+    (re.compile(r'\btienda\b|\bcomprar\b|\bshopping\b|\bcentro comercial\b|\bmercado\b', re.ASCII), 'shopping'),
+)
+
+_TIME_PERIOD_PATTERNS = (
+    (re.compile(r'\bmanana\b|\bdesayuno\b|\btemprano\b', re.ASCII), 'morning'),
+    (re.compile(r'\btarde\b|\balmuerzo\b|\bmediodia\b', re.ASCII), 'afternoon'),
+    (re.compile(r'\bnoche\b|\bcena\b|\btarde\b.*\bnoche\b', re.ASCII), 'evening'),
+)
+
+# Fused alternations that rule out any category or time period in a single search
+_CATEGORY_ANY_RE = re.compile('|'.join(f'(?:{pattern.pattern})' for pattern, _ in _CATEGORY_PATTERNS), re.ASCII)
+_TIME_PERIOD_ANY_RE = re.compile('|'.join(f'(?:{pattern.pattern})' for pattern, _ in _TIME_PERIOD_PATTERNS), re.ASCII)
+
+# Simple food and drink item detection for room service orders
+_FOOD_ITEMS = (
+    'hamburguesa', 'sandwich', 'sándwich', 'ensalada', 'pasta', 'risotto', 
+    'sopa', 'pescado', 'carne', 'pollo', 'filete', 'arroz', 'desayuno',
+    'americano', 'continental', 'huevos', 'fruta', 'postre', 'tiramisú',
+    'cheesecake', 'torta', 'helado'
+)
+
+_DRINK_ITEMS = (
+    'agua', 'jugo', 'refresco', 'soda', 'café', 'té', 'cerveza', 'vino',
+    'cóctel', 'limonada', 'naranja', 'piña', 'gaseosa'
+)
+
+_ORDER_ITEMS = _FOOD_ITEMS + _DRINK_ITEMS
+
+_SPECIAL_INSTRUCTIONS_RE = re.compile(r'(?:con|sin|extra)\s+([a-zá-úñ\s,]+)')
+
+# Motion verbs that signal a transportation request even without a vehicle keyword
+_TRANSPORT_VERB_RE = re.compile(r'\b(?:ir|vamos|voy)\b', re.ASCII)
+
+# Common destinations that should override other patterns, in priority order, each with
+# a literal word its pattern requires so most destinations are ruled out without a regex search
+_COMMON_DESTINATIONS = (
+    ('aeropuerto', 'aeropuerto', re.compile(r'\baeropuerto\b', re.ASCII)),
+    ('centro comercial', 'comercial', re.compile(r'\bcentro\s+comercial\b', re.ASCII)),
+    ('parque lleras', 'lleras', re.compile(r'\bparque\s+lleras\b', re.ASCII)),
+    ('estadio', 'estadio', re.compile(r'\bestadio\b', re.ASCII)),
+    ('terminal', 'terminal', re.compile(r'\bterminal\b', re.ASCII)),
+    ('plaza botero', 'botero', re.compile(r'\bplaza\s+botero\b', re.ASCII)),
+    ('museo', 'museo', re.compile(r'\bmuseo\b', re.ASCII)),
+    ('universidad', 'universidad', re.compile(r'\buniversidad\b', re.ASCII)),
+    ('hospital', 'hospital', re.compile(r'\bhospital\b', re.ASCII)),
+    ('metro', 'metro', re.compile(r'\bmetro\b', re.ASCII)),
+)
+
+_DEST_PATTERNS = (
+    # Pattern for "al/a/hacia/para [destination]"
+    re.compile(r'(?:ir|voy|vamos|llegar|quiero ir)\s+(?:a|al|hacia|para)\s+(?:el|la|los|las)?\s+([a-zá-úñ][a-zá-úñ\s]+?)(?:\s+(?:en|con|a las|para|por|mañana|hoy)|$)'),
+    # Pattern for destinations in taxi/transport requests
+    re.compile(r'(?:pides?|solicitas?|necesitas?|quieres?)?\s+(?:un)?\s+(?:taxi|uber|carro)\s+(?:a|al|hacia|para)\s+(?:el|la|los|las)?\s+([a-zá-úñ][a-zá-úñ\s]+?)(?:\s+(?:para|a)\s+las|$)'),
+    # Basic destination pattern
+    re.compile(r'(?:a|al|hacia|para)\s+(?:el|la|los|las)?\s+([a-zá-úñ][a-zá-úñ\s]+?)(?:\s+(?:en|con|a las|para|por|mañana|hoy)|$)'),
+)
+
+# Cleanup of common verbs/prepositions and trailing vehicle mentions in a destination
+_DEST_LEADING_VERB_RE = re.compile(r'^(?:ir|voy|vamos|quiero|para|hacia)\s+(?:a|al|el|la|los|las)?\s*')
+_DEST_TRAILING_VEHICLE_RE = re.compile(r'\s+(?:en|con|por)\s+(?:taxi|uber|carro).*$')
+
+_PRIVATE_CAR_RE = re.compile(r'carro\s+privado|vehiculo\s+privado', re.ASCII)
+_PASSENGERS_RE = re.compile(r'para\s+(\d+)\s+personas', re.ASCII)
 
 
 def extract_time(text):
-    # Pattern for time with optional "a las" prefix and am/pm
-    time_pattern = r'\b(?:a las\s+)?(\d{1,2})(?:\s*(?:am|pm|AM|PM))?\b'
-    match = re.search(time_pattern, text)
-    if match:
-        hour = int(match.group(1))
-        # Check if "am" or "pm" is in the text
-        if 'pm' in text.lower() and hour < 12:
-            hour += 12
-        elif 'am' in text.lower() and hour == 12:
-            hour = 0
-        return f"{hour:02d}:00"
-    return None
+    match = _TIME_RE.search(text)
+    if not match:
+        return None
+    if match.group('hours'):
+        # Relative expression; parse_pickup_time resolves it from the current time
+        return match.group(0).lower()
+    hour = int(match.group('h'))
+    minute = int(match.group('m') or 0)
+    # Only the am/pm attached to the time counts
+    ap = match.group('ap')
+    if ap and hour <= 12:
+        hour = hour % 12 + (12 if ap.lower() == 'p' else 0)
+    return f"{hour:02d}:{minute:02d}"
 
 def extract_entities(message):
     """
@@ -147,138 +306,101 @@ def extract_entities(message):
     Returns:
         dict: Extracted entities
     """
-    entities = {}
-    
     # Normalize message
     message = message.lower().strip()
     
+    # Hand out a copy of the cached result, since callers modify the dict
+    entities = dict(_extract_entities_cached(message))
+    if 'order_items' in entities:
+        entities['order_items'] = list(entities['order_items'])
+    return entities
+
+
+@lru_cache(maxsize=4096)
+def _extract_entities_cached(message):
+    """
+    Extract entities from a normalized message; cached and never handed out directly
+    
+    Args:
+        message (str): The normalized user message
+        
+    Returns:
+        dict: Extracted entities
+    """
+    entities = {}
+    
+    # Pattern detection runs on accent-folded text; item scanning and captures use the original
+    folded = message.translate(_FOLD_TABLE)
+    
     # Extract time first
-    time = extract_time(message)
+    time = extract_time(folded)
     if time:
         entities['time'] = time
         entities['pickup_time'] = time
     
     # Extract recommendation categories
-    if re.search(r'\brestaurante\b|\bcomer\b|\bcomida\b|\bgastronom[íi]a\b', message):
-        entities['category'] = 'restaurant'
-    elif re.search(r'\bbar\b|\bbeber\b|\btrago\b|\bcoctel\b|\bcerveza\b|\bcervecería\b', message):
-        entities['category'] = 'bar'
-    elif re.search(r'\bcafé\b|\bcafeter[íi]a\b', message):
-        entities['category'] = 'cafe'
-    elif re.search(r'\bmuseo\b|\barte\b|\bcultura\b|\bexhibici[óo]n\b', message):
-        entities['category'] = 'museum'
-    elif re.search(r'\bparque\b|\bplaza\b|\bjard[íi]n\b|\b[áa]rea verde\b', message):
-        entities['category'] = 'park'
-    elif re.search(r'\bturismo\b|\batracci[óo]n\b|\blugar\b.*\btur[íi]stico\b|\bvisitar\b', message):
-        entities['category'] = 'attraction'
-    elif re.search(r'\bactividad\b|\bexperiencia\b|\btour\b|\bexcursi[óo]n\b', message):
-        entities['category'] = 'activity'
-    elif re.search(r'\btienda\b|\bcomprar\b|\bshopping\b|\bcentro comercial\b|\bmercado\b', message):
-        entities['category'] = 'shopping'
+    if _CATEGORY_ANY_RE.search(folded):
+        for pattern, category in _CATEGORY_PATTERNS:
+            if pattern.search(folded):
+                entities['category'] = category
+                break
     
     # Extract time periods
-    if re.search(r'\bma[ñn]ana\b|\bdesayuno\b|\btemprano\b', message):
-        entities['time_period'] = 'morning'
-    elif re.search(r'\btarde\b|\balmuerzo\b|\bmediod[íi]a\b', message):
-        entities['time_period'] = 'afternoon'
-    elif re.search(r'\bnoche\b|\bcena\b|\btarde\b.*\bnoche\b', message):
-        entities['time_period'] = 'evening'
+    if _TIME_PERIOD_ANY_RE.search(folded):
+        for pattern, time_period in _TIME_PERIOD_PATTERNS:
+            if pattern.search(folded):
+                entities['time_period'] = time_period
+                break
     
     # Extract room service items (simplified)
-    if 'room_service' in message or 'servicio a la habitación' in message or 'ordenar' in message:
-        items = []
-        # Simple food item detection
-        food_items = [
-            'hamburguesa', 'sandwich', 'sándwich', 'ensalada', 'pasta', 'risotto', 
-            'sopa', 'pescado', 'carne', 'pollo', 'filete', 'arroz', 'desayuno',
-            'americano', 'continental', 'huevos', 'fruta', 'postre', 'tiramisú',
-            'cheesecake', 'torta', 'helado'
-        ]
-        
-        # Simple drink item detection
-        drink_items = [
-            'agua', 'jugo', 'refresco', 'soda', 'café', 'té', 'cerveza', 'vino',
-            'cóctel', 'limonada', 'naranja', 'piña', 'gaseosa'
-        ]
-        
-        # Check for food items
-        for item in food_items:
-            if item in message:
-                items.append(item)
-        
-        # Check for drink items
-        for item in drink_items:
-            if item in message:
-                items.append(item)
+    if 'room_service' in folded or 'servicio a la habitacion' in folded or 'ordenar' in folded:
+        # Food items first, then drinks
+        items = [item for item in _ORDER_ITEMS if item in message]
         
         if items:
             entities['order_items'] = items
         
         # Extract special instructions
-        special_instr_match = re.search(r'(?:con|sin|extra)\s+([a-zá-úñ\s,]+)', message)
+        special_instr_match = _SPECIAL_INSTRUCTIONS_RE.search(message)
         if special_instr_match:
             entities['special_instructions'] = special_instr_match.group(0)
     
     # Extract transportation details
-    if 'taxi' in message or 'transporte' in message or 'uber' in message or 'carro' in message or re.search(r'\bir\b', message):
+    if 'taxi' in folded or 'transporte' in folded or 'uber' in folded or 'carro' in folded or _TRANSPORT_VERB_RE.search(folded):
         # First check for common destinations that should override other patterns
-        common_destinations = {
-            'aeropuerto': r'\baeropuerto\b',
-            'centro comercial': r'\bcentro\s+comercial\b',
-            'parque lleras': r'\bparque\s+lleras\b',
-            'estadio': r'\bestadio\b',
-            'terminal': r'\bterminal\b',
-            'plaza botero': r'\bplaza\s+botero\b',
-            'museo': r'\bmuseo\b',
-            'universidad': r'\buniversidad\b',
-            'hospital': r'\bhospital\b',
-            'metro': r'\bmetro\b'
-        }
-        
         destination = None
-        for dest, pattern in common_destinations.items():
-            if re.search(pattern, message):
+        for dest, keyword, pattern in _COMMON_DESTINATIONS:
+            if keyword in folded and pattern.search(folded):
                 destination = dest
                 break
                 
         if not destination:
             # Extract destination using various patterns
-            dest_patterns = [
-                # Pattern for "al/a/hacia/para [destination]"
-                r'(?:ir|voy|vamos|llegar|quiero ir)\s+(?:a|al|hacia|para)\s+(?:el|la|los|las)?\s+([a-zá-úñ][a-zá-úñ\s]+?)(?:\s+(?:en|con|a las|para|por|mañana|hoy)|$)',
-                # Pattern for destinations in taxi/transport requests
-                r'(?:pides?|solicitas?|necesitas?|quieres?)?\s+(?:un)?\s+(?:taxi|uber|carro)\s+(?:a|al|hacia|para)\s+(?:el|la|los|las)?\s+([a-zá-úñ][a-zá-úñ\s]+?)(?:\s+(?:para|a)\s+las|$)',
-                # Basic destination pattern
-                r'(?:a|al|hacia|para)\s+(?:el|la|los|las)?\s+([a-zá-úñ][a-zá-úñ\s]+?)(?:\s+(?:en|con|a las|para|por|mañana|hoy)|$)'
-            ]
-            
-            for pattern in dest_patterns:
-                dest_match = re.search(pattern, message)
+            for pattern in _DEST_PATTERNS:
+                dest_match = pattern.search(message)
                 if dest_match:
                     # Clean up destination
                     destination = dest_match.group(1).strip()
                     # Remove common verbs and prepositions
-                    destination = re.sub(r'^(?:ir|voy|vamos|quiero|para|hacia)\s+(?:a|al|el|la|los|las)?\s*', '', destination)
-                    destination = re.sub(r'\s+(?:en|con|por)\s+(?:taxi|uber|carro).*$', '', destination)
+                    destination = _DEST_LEADING_VERB_RE.sub('', destination)
+                    destination = _DEST_TRAILING_VEHICLE_RE.sub('', destination)
                     break
         
         if destination and len(destination) > 2:  # Avoid single letters/articles
             entities['destination'] = destination
         
         # Extract vehicle type
-        if 'uber' in message:
+        if 'uber' in folded:
             entities['vehicle_type'] = 'uber'
-        elif 'taxi' in message:
+        elif 'taxi' in folded:
             entities['vehicle_type'] = 'taxi'
-        elif re.search(r'carro\s+privado|vehículo\s+privado', message):
+        elif _PRIVATE_CAR_RE.search(folded):
             entities['vehicle_type'] = 'private_car'
         
         # Extract number of passengers
-        passengers_match = re.search(r'para\s+(\d+)\s+personas', message)
+        passengers_match = _PASSENGERS_RE.search(folded)
         if passengers_match:
-            try:
-                entities['num_passengers'] = int(passengers_match.group(1))
-            except:
-                pass
+            # The group is \d+, so int() cannot fail
+            entities['num_passengers'] = int(passengers_match.group(1))
     
     return entities